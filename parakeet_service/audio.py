@@ -1,26 +1,87 @@
 """
 Audio helpers:
 * ensure_mono_16k(path)  -> Path (possibly rewritten .wav)
-* schedule_cleanup(background, *paths)
+* ensure_mono_16k_async(path) -> same, run on the audio worker pool
+* is_silent(path, layout) -> whether a prepared WAV is too short/quiet to transcribe
+* remove_files(*paths)
 """
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import math
+import mmap
+import os
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+from uuid import uuid4
 
-import librosa
 import numpy as np
 import soundfile as sf  # type: ignore
-from fastapi import BackgroundTasks, HTTPException, status
+import soxr
+from fastapi import HTTPException, status
 
-from parakeet_service.config import TARGET_SR, get_logger
+from parakeet_service.config import (
+    MIN_AUDIO_SECONDS,
+    SILENCE_THRESHOLD_DBFS,
+    TARGET_SR,
+    get_logger,
+)
 
 logger = get_logger("parakeet_service.audio")
 
 SUPPORTED_EXTS: List[str] = [".wav", ".flac", ".mp3", ".ogg", ".opus"]
 
+# Silence is judged on every Nth sample; plenty for an RMS estimate
+_SILENCE_DECIMATION = 16
+# Loudest window of this length decides, so short speech in silence counts
+_SILENCE_WINDOW_SECONDS = 0.1
+
+# Decode/resample is CPU-bound; keep it off the event loop on a bounded pool
+_AUDIO_POOL = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="parakeet-audio"
+)
+
+# One private directory per process for request scratch files
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="parakeet_"))
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+
+def scratch_path(suffix: str) -> Path:
+    """Return a fresh, unused path in SCRATCH_DIR."""
+    return SCRATCH_DIR / f"{uuid4().hex}{suffix}"
+
+
+def open_scratch_file(suffix: str) -> Tuple[int, Path]:
+    """Create a scratch file and return its write-only fd and path."""
+    path = scratch_path(suffix)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    return fd, path
+
+
+def _aligned_chunk_size(sr_orig: int, seconds: int) -> int:
+    """
+    Largest multiple of the input-side resampling period not exceeding
+    ``seconds`` of audio, so every chunk maps to a whole number of 16 kHz frames.
+    """
+    period = sr_orig // math.gcd(sr_orig, TARGET_SR)
+    return max(1, (seconds * sr_orig) // period) * period
+
+
+def _downmix_into(frames: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Average a (frames, channels) float32 block into ``out`` without temporaries."""
+    channels = frames.shape[1]
+    if channels == 2:
+        np.add(frames[:, 0], frames[:, 1], out=out)
+    else:
+        np.einsum("tc->t", frames, out=out)
+    out *= np.float32(1.0 / channels)
+    return out
+
 
 def convert_audio_streaming(src: Path) -> Tuple[Path, Path]:
     """
@@ -49,43 +110,68 @@ def convert_audio_streaming(src: Path) -> Tuple[Path, Path]:
 
             logger.debug(f"Audio file info: {sr_orig}Hz, {channels} channels")
 
-            # Create temp output file
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            dst = Path(tmp.name)
+            # SoundFile creates the output itself; it only needs a fresh path
+            dst = scratch_path(".wav")
 
-            with sf.SoundFile(
-                tmp.name, "w", samplerate=16000, channels=1, subtype="PCM_16"
-            ) as out:
-                # Process in 10-second chunks
-                chunk_size = 10 * sr_orig
-                total_frames_processed = 0
+            # Persistent resampler so filter state carries across chunk boundaries
+            resampler = (
+                soxr.ResampleStream(sr_orig, 16000, 1, dtype="float32", quality="HQ")
+                if sr_orig != 16000
+                else None
+            )
 
-                while True:
-                    chunk = snd.read(int(chunk_size), dtype="float32")
-                    if len(chunk) == 0:
-                        break
+            # Don't leave a partial output behind if conversion fails midway
+            try:
+                with sf.SoundFile(
+                    dst, "w", samplerate=16000, channels=1, subtype="PCM_16"
+                ) as out:
+                    # Process in ~10-second chunks aligned to the resampling ratio
+                    chunk_size = _aligned_chunk_size(sr_orig, 10)
+                    total_frames_processed = 0
 
-                    # Convert to mono if needed
+                    # Read and down-mix buffers are allocated once and reused per chunk
                     if channels > 1:
-                        chunk = np.mean(chunk, axis=1)
-
-                    # Resample if needed using librosa
-                    if sr_orig != 16000:
-                        try:
-                            chunk = librosa.resample(
-                                chunk, orig_sr=sr_orig, target_sr=16000
-                            )
-                        except Exception as e:
-                            logger.error(
-                                f"Resampling failed at frame {total_frames_processed}: {e}"
-                            )
-                            raise HTTPException(
-                                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                detail=f"Audio resampling failed: {e}",
-                            ) from e
-
-                    out.write(chunk)
-                    total_frames_processed += len(chunk)
+                        frames_buf = np.empty((chunk_size, channels), dtype=np.float32)
+                        mono_buf = np.empty(chunk_size, dtype=np.float32)
+                    else:
+                        frames_buf = np.empty(chunk_size, dtype=np.float32)
+
+                    while True:
+                        chunk = snd.read(chunk_size, dtype="float32", out=frames_buf)
+                        n = len(chunk)
+                        if n == 0:
+                            break
+
+                        # Convert to mono if needed
+                        if channels > 1:
+                            chunk = _downmix_into(chunk, mono_buf[:n])
+
+                        # Resample if needed using soxr
+                        if resampler is not None:
+                            try:
+                                chunk = resampler.resample_chunk(chunk, last=False)
+                            except Exception as e:
+                                logger.error(
+                                    f"Resampling failed at frame {total_frames_processed}: {e}"
+                                )
+                                raise HTTPException(
+                                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                    detail=f"Audio resampling failed: {e}",
+                                ) from e
+
+                        out.write(chunk)
+                        total_frames_processed += len(chunk)
+
+                    # Flush samples still buffered in the resampler
+                    if resampler is not None:
+                        tail = resampler.resample_chunk(
+                            np.empty(0, dtype=np.float32), last=True
+                        )
+                        out.write(tail)
+                        total_frames_processed += len(tail)
+            except BaseException:
+                dst.unlink(missing_ok=True)
+                raise
 
             logger.debug(
                 f"Streaming conversion completed: {total_frames_processed} frames processed"
@@ -125,13 +211,12 @@ def ensure_mono_16k_standard(src: Path) -> Tuple[Path, Path]:
     Standard full-file audio conversion (fallback)
     """
     try:
-        logger.debug(f"Loading audio file with librosa: {src}")
-        wav, sr = librosa.load(src, sr=None, mono=False)
-        logger.debug(
-            f"Loaded audio: shape={wav.shape if hasattr(wav, 'shape') else 'scalar'}, sr={sr}"
-        )
-    except librosa.LibrosaError as e:
-        logger.error(f"Librosa failed to load audio {src}: {e}")
+        logger.debug(f"Loading audio file with soundfile: {src}")
+        data, sr = sf.read(src, dtype="float32", always_2d=True)
+        channels = data.shape[1]
+        logger.debug(f"Loaded audio: shape={data.shape}, sr={sr}")
+    except sf.LibsndfileError as e:
+        logger.error(f"soundfile failed to load audio {src}: {e}")
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             detail=f"Failed to load audio file: {e}",
@@ -145,17 +230,20 @@ def ensure_mono_16k_standard(src: Path) -> Tuple[Path, Path]:
         ) from e
 
     try:
-        # Handle stereo to mono conversion
-        if wav.ndim > 1:
+        # Handle stereo to mono conversion, dropping the decoded block right away
+        if channels > 1:
             logger.debug("Converting stereo to mono")
-            wav = np.mean(wav, axis=0)
+            wav = _downmix_into(data, np.empty(len(data), dtype=np.float32))
+        else:
+            wav = data[:, 0]
+        del data
 
         # Resample if needed
         if sr != TARGET_SR:
             logger.debug(f"Resampling from {sr}Hz to {TARGET_SR}Hz")
-            wav = librosa.resample(wav, orig_sr=sr, target_sr=TARGET_SR)
+            wav = soxr.resample(wav, sr, TARGET_SR, quality="HQ")
 
-        if src.suffix.lower() == ".wav" and sr == TARGET_SR:
+        if src.suffix.lower() == ".wav" and sr == TARGET_SR and channels == 1:
             # If already correct format, can reuse the file
             logger.debug("Audio file already in correct format, reusing original")
             return src, src
@@ -174,43 +262,181 @@ def ensure_mono_16k_standard(src: Path) -> Tuple[Path, Path]:
         ) from e
 
 
-def ensure_mono_16k(src: Path) -> Tuple[Path, Path]:
+class WavLayout(NamedTuple):
+    audio_format: int  # 1 = integer PCM
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def bytes_per_second(self) -> int:
+        """Computed from the fmt fields; the header's byte_rate is often wrong."""
+        return self.sample_rate * self.channels * self.bits_per_sample // 8
+
+
+# Size streaming writers put in the data header before the length is known
+_WAV_UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+def wav_layout(path: Path) -> Optional[WavLayout]:
     """
-    Down-mix and resample to mono/16 kHz using streaming when possible.
+    Read the fmt and data chunk details from a WAV's RIFF header, seeking
+    past any other chunks (LIST, bext, ...) however large they are.
+    Returns None when the file isn't a WAV or the header can't be parsed.
+    """
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id = header[:4]
+            chunk_size = int.from_bytes(header[4:], "little")
+            if chunk_id == b"data":
+                break
+            if chunk_id == b"fmt ":
+                if chunk_size < 16:
+                    return None
+                fmt = f.read(16)
+                chunk_size -= 16
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+        if fmt is None or len(fmt) < 16:
+            return None
+
+        data_offset = f.tell()
+        available = os.fstat(f.fileno()).st_size - data_offset
+
+    # Placeholder or truncated sizes: the data runs to the end of the file
+    if chunk_size in _WAV_UNKNOWN_SIZES or chunk_size > available:
+        chunk_size = max(available, 0)
+
+    return WavLayout(
+        audio_format=int.from_bytes(fmt[0:2], "little"),
+        channels=int.from_bytes(fmt[2:4], "little"),
+        sample_rate=int.from_bytes(fmt[4:8], "little"),
+        bits_per_sample=int.from_bytes(fmt[14:16], "little"),
+        data_offset=data_offset,
+        data_size=chunk_size,
+    )
+
+
+def _wav_is_mono_16k(path: Path) -> Optional[bool]:
     """
-    if src.suffix.lower() not in SUPPORTED_EXTS:
-        logger.error(f"Unsupported file type: {src.suffix}")
+    Check a WAV's RIFF header for mono/16kHz.
+    Returns None when the header can't be parsed.
+    """
+    layout = wav_layout(path)
+    if layout is None:
+        return None
+    return layout.channels == 1 and layout.sample_rate == TARGET_SR
+
+
+def is_silent(path: Path, layout: Optional[WavLayout]) -> bool:
+    """
+    True when a prepared WAV is too short or too quiet to contain speech.
+    layout is wav_layout(path), passed in so callers parse the header once.
+    Only 16-bit PCM is level-checked, straight from the mapped file, using
+    the highest RMS over _SILENCE_WINDOW_SECONDS windows.
+    """
+    if layout is None or not layout.bytes_per_second:
+        return False
+    if layout.data_size / layout.bytes_per_second < MIN_AUDIO_SECONDS:
+        return True
+    if layout.audio_format != 1 or layout.bits_per_sample != 16:
+        return False
+
+    window = max(
+        1,
+        int(layout.sample_rate * layout.channels * _SILENCE_WINDOW_SECONDS)
+        // _SILENCE_DECIMATION,
+    )
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            count = layout.data_size // 2
+            if not count:
+                return True
+            samples = np.frombuffer(
+                mapped, dtype="<i2", count=count, offset=layout.data_offset
+            )[::_SILENCE_DECIMATION]
+            starts = np.arange(0, len(samples), window)
+            energy = np.add.reduceat(np.square(samples, dtype=np.float32), starts)
+            lengths = np.diff(starts, append=len(samples))
+            rms = math.sqrt(float(np.max(energy / lengths)))
+            # The view must be gone before the mapping is closed
+            del samples
+
+    return rms / 32768.0 < 10 ** (SILENCE_THRESHOLD_DBFS / 20)
+
+
+def check_supported_suffix(suffix: str) -> None:
+    """Raise 415 unless suffix is one of SUPPORTED_EXTS."""
+    if suffix.lower() not in SUPPORTED_EXTS:
+        logger.error(f"Unsupported file type: {suffix}")
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail=f"Unsupported file type {src.suffix}. Supported formats: {', '.join(SUPPORTED_EXTS)}",
+            detail=f"Unsupported file type {suffix}. Supported formats: {', '.join(SUPPORTED_EXTS)}",
         )
 
+
+def ensure_mono_16k(src: Path) -> Tuple[Path, Path]:
+    """
+    Down-mix and resample to mono/16 kHz using streaming when possible.
+    """
+    check_supported_suffix(src.suffix)
+
     # For WAV files that are already mono and 16kHz, no conversion needed
     if src.suffix.lower() == ".wav":
         try:
-            with sf.SoundFile(src) as snd:
-                if snd.samplerate == 16000 and snd.channels == 1:
-                    logger.debug("Audio file already in correct format")
-                    return src, src
-        except Exception as e:
-            logger.warning(
-                f"Failed to check WAV file format for {src}: {e}, proceeding with conversion"
-            )
+            is_mono_16k = _wav_is_mono_16k(src)
+        except OSError as e:
+            logger.warning(f"Failed to read WAV header for {src}: {e}")
+            is_mono_16k = None
+
+        if is_mono_16k:
+            logger.debug("Audio file already in correct format")
+            return src, src
+
+        # Headers we can't parse still need a full libsndfile parse
+        if is_mono_16k is None:
+            try:
+                with sf.SoundFile(src) as snd:
+                    if snd.samplerate == 16000 and snd.channels == 1:
+                        logger.debug("Audio file already in correct format")
+                        return src, src
+            except Exception as e:
+                logger.warning(
+                    f"Failed to check WAV file format for {src}: {e}, proceeding with conversion"
+                )
 
     # Use streaming conversion for other cases
     logger.debug(f"Converting audio file: {src}")
     return convert_audio_streaming(src)
 
 
-def schedule_cleanup(tasks: BackgroundTasks, *paths: Path) -> None:
-    """Schedule cleanup of temporary files."""
-    cleanup_count = 0
-    for p in paths:
-        if p and p.exists():
-            tasks.add_task(p.unlink, missing_ok=True)
-            cleanup_count += 1
+async def ensure_mono_16k_async(src: Path) -> Tuple[Path, Path]:
+    """Run ensure_mono_16k on the audio worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_AUDIO_POOL, ensure_mono_16k, src)
 
-    if cleanup_count > 0:
-        logger.debug(f"Scheduled cleanup of {cleanup_count} temporary files")
-    else:
-        logger.debug("No temporary files to clean up")
+
+def remove_files(*paths: Path) -> None:
+    """Delete temporary files, ignoring ones that are already gone."""
+    removed = 0
+    for p in set(paths):
+        try:
+            p.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove temporary file {p}: {e}")
+
+    logger.debug(f"Removed {removed} temporary files")
@@ -14,9 +14,22 @@ DEFAULT_MODEL_NAME = "mlx-community/parakeet-tdt-1.1b"
 # Server configuration
 WORKERS = int(os.getenv("PARAKEET_WORKERS", "1"))
 
+# Number of transcription results kept per worker for repeated uploads. Off by
+# default: entries hold full transcripts with word timestamps
+RESULT_CACHE_SIZE = int(os.getenv("PARAKEET_RESULT_CACHE_SIZE", "0"))
+
 # Audio processing configuration
 TARGET_SR = 16000
-MODEL_PRECISION = "bf16"
+# Audio shorter than this or quieter than this RMS level skips inference
+MIN_AUDIO_SECONDS = 0.05
+SILENCE_THRESHOLD_DBFS = float(os.getenv("PARAKEET_SILENCE_DBFS", "-70"))
+# Largest accepted request body in bytes; larger ones are rejected with 413
+MAX_AUDIO_BYTES = int(os.getenv("PARAKEET_MAX_AUDIO_BYTES", str(500 * 1024 * 1024)))
+# One of "bf16" (parakeet-mlx's default), "fp16", "fp32" or "int4". Audio
+# features stay float32 either way, so this trades weight memory for accuracy,
+# not speed. int4 quantizes the Linear layers only; the encoder's pre_encode
+# and layers with an input dim not divisible by 64 stay in bf16
+MODEL_PRECISION = os.getenv("PARAKEET_PRECISION", "bf16").lower()
 
 # Logging configuration
 _logging_configured = False
@@ -74,6 +87,7 @@ def configure_logging(log_level: str = "INFO") -> None:
     # Suppress noisy third-party loggers unless in debug mode
     if level > logging.DEBUG:
         logging.getLogger("mlx").setLevel(logging.WARNING)
+        # Still imported (and logged from) by parakeet-mlx itself
         logging.getLogger("librosa").setLevel(logging.WARNING)
         logging.getLogger("soundfile").setLevel(logging.WARNING)
         logging.getLogger("urllib3").setLevel(logging.WARNING)
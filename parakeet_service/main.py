@@ -4,9 +4,12 @@ from typing import Optional
 
 import typer
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from parakeet_service import config
 from parakeet_service.config import WORKERS, configure_logging, logger
+from parakeet_service.middleware import MaxBodySizeMiddleware
 from parakeet_service.model import lifespan
 from parakeet_service.routes import router
 
@@ -35,6 +38,7 @@ def create_app(model_name: Optional[str] = None) -> FastAPI:
             "with optional word/char/segment timestamps."
         ),
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # Set model name in app state if provided
@@ -43,6 +47,12 @@ def create_app(model_name: Optional[str] = None) -> FastAPI:
 
     server.include_router(router)
 
+    # verbose_json transcripts with word timestamps compress very well
+    server.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+    # Oversize uploads are refused before FastAPI receives and spools them
+    server.add_middleware(MaxBodySizeMiddleware, max_bytes=config.MAX_AUDIO_BYTES)
+
     # TODO: improve streaming and add support for other audio formats (maybe)
 
     logger.info("FastAPI app initialised")
@@ -125,12 +135,24 @@ def cmd(
                 logger.exception("Model configuration error details:")
                 sys.exit(1)
 
+        # All requests share the one loaded model and its inference thread.
+        # Extra workers would each load their own copy of the weights (MLX
+        # state can't be shared across a fork), and uvicorn refuses workers > 1
+        # for an app object anyway
+        workers = WORKERS
+        if workers > 1:
+            logger.warning(
+                f"PARAKEET_WORKERS={workers} ignored; serving from a single "
+                "process that shares one model instance"
+            )
+            workers = 1
+
         # Start the server with proper logging configuration
         uvicorn.run(
             app,
             host=host,
             port=port,
-            workers=WORKERS,
+            workers=workers,
             log_level=log_level.lower(),
             access_log=True,
             reload=False,
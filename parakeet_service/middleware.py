@@ -0,0 +1,67 @@
+"""
+ASGI middleware:
+* MaxBodySizeMiddleware(app, max_bytes) -> 413 for request bodies over max_bytes
+"""
+
+from __future__ import annotations
+
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+
+from parakeet_service.config import get_logger
+
+logger = get_logger("parakeet_service.middleware")
+
+
+class MaxBodySizeMiddleware:
+    """
+    Reject oversize request bodies before FastAPI parses (and spools) them:
+    a declared Content-Length over the limit is answered right away, and
+    bodies without one are cut off as soon as they cross it.
+    """
+
+    def __init__(self, app, max_bytes: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit():
+                if int(value) > self.max_bytes:
+                    logger.error(
+                        f"Request body of {int(value)} bytes exceeds the "
+                        f"{self.max_bytes} byte limit"
+                    )
+                    response = ORJSONResponse(
+                        {"detail": self._detail()},
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    logger.error(
+                        f"Request body exceeds the {self.max_bytes} byte limit"
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=self._detail(),
+                    )
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+    def _detail(self) -> str:
+        return f"Audio file too large (limit {self.max_bytes} bytes)"
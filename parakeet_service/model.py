@@ -1,12 +1,49 @@
+import functools
 import gc
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
+import mlx.core as mx
+import mlx.nn as nn
 from parakeet_mlx import from_pretrained  # type: ignore
 
-from parakeet_service.config import DEFAULT_MODEL_NAME, MODEL_PRECISION, get_logger
+from parakeet_service.cache import ResultCache
+from parakeet_service.config import (
+    DEFAULT_MODEL_NAME,
+    MODEL_PRECISION,
+    RESULT_CACHE_SIZE,
+    get_logger,
+)
 
 logger = get_logger("parakeet_service.model")
 
+_PRECISION_DTYPES = {
+    "fp16": mx.float16,
+    "bf16": mx.bfloat16,
+    "fp32": mx.float32,
+    # Quantized weights; layers left unquantized stay in bf16
+    "int4": mx.bfloat16,
+}
+
+# Length of the windows parakeet-mlx splits long audio into, in seconds
+CHUNK_DURATION = 120.0
+
+_QUANTIZE_BITS = {"int4": 4}
+_QUANTIZE_GROUP_SIZE = 64
+
+
+def _is_quantizable(path: str, module) -> bool:
+    """
+    Quantize only Linear layers whose input dim splits into whole groups.
+    The encoder's pre_encode stays as is: parakeet-mlx checks it with
+    isinstance(..., nn.Linear), which a QuantizedLinear would fail.
+    """
+    return (
+        isinstance(module, nn.Linear)
+        and "pre_encode" not in path.split(".")
+        and module.weight.shape[-1] % _QUANTIZE_GROUP_SIZE == 0
+    )
+
 
 class ModelLoadingError(Exception):
     """Custom exception for model loading failures."""
@@ -14,17 +51,6 @@ class ModelLoadingError(Exception):
     pass
 
 
-def _to_builtin(obj):
-    """Convert parakeet-mlx results to JSON-safe format."""
-    if hasattr(obj, "__dict__"):
-        return {k: _to_builtin(v) for k, v in obj.__dict__.items()}
-    if isinstance(obj, (list, tuple)):
-        return [_to_builtin(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: _to_builtin(v) for k, v in obj.items()}
-    return obj
-
-
 @asynccontextmanager
 async def lifespan(app):
     """Load model once per process; cleanup on shutdown."""
@@ -37,21 +63,45 @@ async def lifespan(app):
     app.state.model_loaded = False
     app.state.model_error = None
     app.state.asr_model = None
+    app.state.transcribe = None
+    app.state.result_cache = ResultCache(RESULT_CACHE_SIZE)
+    # Inference runs on a single dedicated thread: MLX work on one model is
+    # serialised anyway, and excess requests queue without blocking the loop
+    app.state.asr_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="parakeet-asr"
+    )
 
     try:
+        # Resolve the weight dtype before loading so no post-hoc cast is needed
+        precision = MODEL_PRECISION
+        if precision not in _PRECISION_DTYPES:
+            logger.warning(f"Unknown precision '{precision}', falling back to bf16")
+            precision = "bf16"
+        logger.info(f"Using {precision} precision")
+
         # Load model with parakeet-mlx
-        model = from_pretrained(model_name)
+        model = from_pretrained(model_name, dtype=_PRECISION_DTYPES[precision])
 
-        # Configure precision - MLX uses bf16 by default, but we can set fp32 if needed
-        if MODEL_PRECISION == "fp32":
-            # Note: parakeet-mlx handles precision internally
-            logger.info("Using fp32 precision")
-        else:
-            logger.info("Using bf16 precision (default)")
+        if precision in _QUANTIZE_BITS:
+            nn.quantize(
+                model,
+                group_size=_QUANTIZE_GROUP_SIZE,
+                bits=_QUANTIZE_BITS[precision],
+                class_predicate=_is_quantizable,
+            )
+            logger.info(f"Quantized linear layers to {_QUANTIZE_BITS[precision]} bits")
+
+        # MLX loads weights lazily; materialise them now so the first
+        # request doesn't pay for reading them into unified memory
+        mx.eval(model.parameters())
 
         logger.info("Model loaded successfully with MLX")
 
         app.state.asr_model = model
+        # Only the overlap depends on the request; bind everything else once
+        app.state.transcribe = functools.partial(
+            model.transcribe, chunk_duration=CHUNK_DURATION
+        )
         app.state.model_loaded = True
         logger.info("Model ready for inference")
 
@@ -90,9 +140,12 @@ async def lifespan(app):
     finally:
         logger.info("Shutting down and releasing resources")
         try:
+            app.state.transcribe = None
             if hasattr(app.state, "asr_model") and app.state.asr_model is not None:
                 del app.state.asr_model
         except AttributeError:
             logger.warning("ASR model was not found in app state during cleanup")
+        app.state.result_cache.clear()
+        app.state.asr_executor.shutdown(wait=True, cancel_futures=True)
         gc.collect()
         logger.info("Resource cleanup completed")
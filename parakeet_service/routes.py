@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-import tempfile
+import functools
+import hashlib
+import io
+import mmap
+import os
 import time
 import zlib
+from collections import deque
+from itertools import chain
 from pathlib import Path
-from typing import Annotated, List, Literal, Optional
+from typing import Annotated, AsyncIterator, Deque, List, Literal, Optional, Tuple
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     File,
     Form,
     HTTPException,
@@ -17,23 +22,53 @@ from fastapi import (
     UploadFile,
     status,
 )
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from parakeet_mlx.alignment import AlignedResult
 from parakeet_mlx.cli import _aligned_sentence_to_dict, to_srt, to_txt, to_vtt
+from starlette.formparsers import MultiPartParser
 
 from parakeet_service import config
-from parakeet_service.audio import ensure_mono_16k, schedule_cleanup
+from parakeet_service.audio import (
+    WavLayout,
+    check_supported_suffix,
+    ensure_mono_16k_async,
+    is_silent,
+    open_scratch_file,
+    remove_files,
+    wav_layout,
+)
 from parakeet_service.config import get_logger
 from parakeet_service.schemas import (
     TranscriptionResponse,
     TranscriptionSegment,
     TranscriptionUsage,
-    TranscriptionWord,
 )
 
 logger = get_logger("parakeet_service.routes")
 
 router = APIRouter(tags=["speech"])
 
+# Uploads are already spooled by Starlette; read them back in large chunks
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Size past which Starlette spools an upload to disk (named max_file_size
+# before Starlette 0.46)
+_SPOOL_MAX_SIZE = getattr(
+    MultiPartParser,
+    "spool_max_size",
+    getattr(MultiPartParser, "max_file_size", 1024 * 1024),
+)
+
+# FFmpeg stderr lines kept for error reporting
+FFMPEG_STDERR_MAX_LINES = 50
+
+# Plain-text response formats: (formatter, media type)
+_TEXT_FORMATS = {
+    "text": (to_txt, "text/plain"),
+    "srt": (functools.partial(to_srt, highlight_words=False), "application/x-subrip"),
+    "vtt": (functools.partial(to_vtt, highlight_words=False), "text/vtt"),
+}
+
 
 @router.get("/healthz", summary="Liveness/readiness probe")
 def health(request: Request):
@@ -59,7 +94,6 @@ def health(request: Request):
 )
 async def transcribe_audio(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: Annotated[UploadFile, File(description="The audio file to transcribe")],
     model: Annotated[
         str, Form(description="Model to use for transcription")
@@ -118,152 +152,58 @@ async def transcribe_audio(
             "stream parameter is not supported by parakeet and will be ignored"
         )
 
-    # Create temp file with appropriate extension
+    # Fail fast if the model is unavailable. FastAPI has already spooled the
+    # body by now; this only skips the scratch-file and transcoding work
+    app_state = request.app.state
+    transcribe = getattr(app_state, "transcribe", None)
+    if transcribe is None or not getattr(app_state, "model_loaded", False):
+        error_msg = getattr(app_state, "model_error", None) or "Model failed to load"
+        logger.error(f"ASR model not available: {error_msg}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Speech recognition service temporarily unavailable",
+        )
+
+    # Create temp file with appropriate extension; MP3 uploads are transcoded
+    # by FFmpeg straight into a 16kHz mono WAV, so that file is the WAV itself
     suffix = Path(file.filename or "").suffix or ".wav"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp_path = Path(tmp.name)
+    check_supported_suffix(suffix)
+    is_mp3 = suffix.lower() == ".mp3"
+    tmp_fd, tmp_path = open_scratch_file(".wav" if is_mp3 else suffix)
 
-    mp3_tmp_path = None
+    # Hash the upload as it streams so repeated files can reuse a cached result;
+    # with the cache disabled (the default) skip hashing altogether
+    result_cache = getattr(app_state, "result_cache", None)
+    if result_cache is not None and result_cache.maxsize <= 0:
+        result_cache = None
+    upload_hash = hashlib.blake2b(digest_size=16) if result_cache is not None else None
 
     # Stream upload directly to processing with cancellation handling
     try:
-        # Use FFmpeg for MP3 files to fix header issues
-        # Create temp MP3 file if needed
-        if suffix.lower() == ".mp3":
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as mp3_tmp:
-                mp3_tmp_path = Path(mp3_tmp.name)
-            # Write entire MP3 to temporary file
-            with open(mp3_tmp_path, "wb") as f:
-                while True:
-                    try:
-                        chunk = await file.read(8192)
-                    except asyncio.CancelledError:
-                        logger.warning("File upload cancelled during MP3 saving")
-                        raise
-                    except Exception as e:
-                        logger.error(f"Error reading file chunk: {e}")
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"Failed to read audio file: {e}",
-                        ) from e
-                    if not chunk:
-                        break
-                    f.write(chunk)
-
-            # Update FFmpeg command to read from file
-            ffmpeg_cmd = [
-                "ffmpeg",
-                "-v",
-                "error",
-                "-nostdin",
-                "-y",
-                "-i",
-                str(mp3_tmp_path),
-                "-acodec",
-                "pcm_s16le",
-                "-ac",
-                "1",
-                "-ar",
-                "16000",
-                "-f",
-                "wav",
-                str(tmp_path),
-            ]
+        if is_mp3:
+            # Use FFmpeg for MP3 files to fix header issues; it opens the path itself
+            os.close(tmp_fd)
+            await _transcode_upload_with_ffmpeg(file, tmp_path, upload_hash)
         else:
-            ffmpeg_cmd = None
-            # For non-MP3, stream directly to file
-            with open(tmp_path, "wb") as f:
-                while True:
-                    try:
-                        chunk = await file.read(8192)
-                    except asyncio.CancelledError:
-                        logger.warning("File upload cancelled during processing")
-                        raise
-                    except Exception as e:
-                        logger.error(f"Error reading file chunk: {e}")
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"Failed to read audio file: {e}",
-                        ) from e
-                    if not chunk:
-                        break
-                    f.write(chunk)
-
-        # Run FFmpeg if processing MP3
-        if ffmpeg_cmd:
-            try:
-                process = await asyncio.create_subprocess_exec(
-                    *ffmpeg_cmd,
-                    stdout=asyncio.subprocess.DEVNULL,  # We don't need stdout
-                    stderr=asyncio.subprocess.PIPE,
-                )
-
-                # Read stderr in real-time
-                stderr_lines = []
-                if process.stderr:  # Check if stderr is not None
-                    while True:
-                        line = await process.stderr.readline()
-                        if not line:
-                            break
-                        line_str = line.decode().strip()
-                        stderr_lines.append(line_str)
-                        logger.debug(f"FFmpeg: {line_str}")
-
-                # Wait for process to finish
-                return_code = await process.wait()
-                stderr_str = "\n".join(stderr_lines)
-
-                if return_code != 0:
-                    logger.error(f"FFmpeg failed with return code {return_code}")
-                    logger.error(f"FFmpeg error output: {stderr_str}")
-                    raise HTTPException(
-                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                        detail=f"Invalid audio format: {stderr_str[:200]}",
-                    )
-                else:
-                    logger.debug("FFmpeg completed successfully")
-
-            except FileNotFoundError as e:
-                logger.error("FFmpeg not found on system")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="FFmpeg is required for MP3 processing but not found on system",
-                ) from e
-            except Exception as e:
-                logger.error(f"FFmpeg processing error: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Audio processing failed: {e}",
-                ) from e
+            # For non-MP3, stream directly into the temp file's fd
+            await _write_upload_to_fd(file, tmp_fd, upload_hash)
 
     except asyncio.CancelledError:
         # Clean up temporary files if processing was canceled
         logger.info("Request cancelled, cleaning up temporary files")
         if tmp_path.exists():
             tmp_path.unlink()
-        if mp3_tmp_path and mp3_tmp_path.exists():
-            mp3_tmp_path.unlink()
         raise
-    except BrokenPipeError as err:
-        logger.error("FFmpeg process terminated unexpectedly")
-        if tmp_path.exists():
-            tmp_path.unlink()
-        if mp3_tmp_path and mp3_tmp_path.exists():
-            mp3_tmp_path.unlink()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Audio processing failed due to FFmpeg crash",
-        ) from err
     except HTTPException:
         # Re-raise HTTP exceptions without wrapping
+        if tmp_path.exists():
+            tmp_path.unlink()
         raise
     except Exception as e:
         logger.error(f"Unexpected error during file processing: {e}")
         logger.exception("File processing error details:")
         if tmp_path.exists():
             tmp_path.unlink()
-        if mp3_tmp_path and mp3_tmp_path.exists():
-            mp3_tmp_path.unlink()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during file processing",
@@ -274,92 +214,81 @@ async def transcribe_audio(
         except Exception as e:
             logger.warning(f"Error closing uploaded file: {e}")
 
-    # Process audio to ensure mono 16kHz
-    try:
-        original, to_model = ensure_mono_16k(tmp_path)
-        logger.info("transcribe(): processing audio file")
-    except HTTPException:
-        # Re-raise HTTP exceptions from audio processing
-        raise
-    except Exception as e:
-        logger.error(f"Audio preprocessing failed: {e}")
-        logger.exception("Audio preprocessing error details:")
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Audio preprocessing failed: {e}",
-        ) from e
-
-    # Clean up temporary files
-    cleanup_files = [original, to_model]
-    if mp3_tmp_path:
-        cleanup_files.append(mp3_tmp_path)
-    schedule_cleanup(background_tasks, *cleanup_files)
-
-    try:
-        if not getattr(request.app.state, "model_loaded", False):
-            error_msg = getattr(
-                request.app.state, "model_error", "Model failed to load"
-            )
-            logger.error(f"ASR model not available: {error_msg}")
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Speech recognition service temporarily unavailable",
-            )
+    cache_key = cached = None
+    if upload_hash is not None:
+        # The suffix picks the decode path, so identical bytes under another
+        # extension don't share a result
+        cache_key = (suffix.lower(), upload_hash.hexdigest())
+        cached = result_cache.get(cache_key)
 
-        model = request.app.state.asr_model
-        if model is None:
-            logger.error("ASR model is None despite model_loaded being True")
+    if cached is not None:
+        logger.info("transcribe(): reusing cached result for identical upload")
+        scratch_files = (tmp_path,)
+    else:
+        # Process audio to ensure mono 16kHz
+        try:
+            original, to_model = await _preprocess_upload(tmp_path)
+            logger.info("transcribe(): processing audio file")
+        except HTTPException:
+            # Re-raise HTTP exceptions from audio processing
+            remove_files(tmp_path)
+            raise
+        except Exception as e:
+            logger.error(f"Audio preprocessing failed: {e}")
+            logger.exception("Audio preprocessing error details:")
+            remove_files(tmp_path)
             raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Speech recognition service temporarily unavailable",
-            )
-
-    except AttributeError:
-        logger.error("ASR model state not available in app state")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Speech recognition service temporarily unavailable",
-        ) from None
-
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Audio preprocessing failed: {e}",
+            ) from e
+        scratch_files = (original, to_model)
+
+    # The response is built from the result in memory, so temporary files are
+    # removed when the request ends either way; BackgroundTasks would be
+    # skipped whenever the handler raises or is cancelled
     try:
         start_time = time.time()
 
-        chunk_duration_param = 60 * 2
-        overlap_duration_param = 15
+        if cached is not None:
+            result, audio_duration = cached
+        else:
+            layout = await asyncio.to_thread(_read_wav_layout, to_model)
+            if await asyncio.to_thread(is_silent, to_model, layout):
+                # Nothing to recognise; skip the encoder pass entirely
+                logger.info("transcribe(): audio is silent, skipping inference")
+                result = AlignedResult(text="", sentences=[])
+            else:
+                overlap_duration_param = _overlap_duration(
+                    _calculate_audio_duration(layout)
+                )
+
+                # Run inference on the ASR thread so the event loop stays responsive
+                result = await asyncio.get_running_loop().run_in_executor(
+                    app_state.asr_executor,
+                    functools.partial(
+                        transcribe,
+                        str(to_model),
+                        overlap_duration=overlap_duration_param,
+                    ),
+                )
+            audio_duration = _get_audio_duration(result, layout)
 
-        result = model.transcribe(
-            str(to_model),
-            chunk_duration=chunk_duration_param,
-            overlap_duration=overlap_duration_param,
-        )
+            if result_cache is not None:
+                result_cache.put(cache_key, (result, audio_duration))
 
         duration = time.time() - start_time
         merged_text = result.text
 
         # Determine timestamp granularities to include
-        include_words = False
-        include_segments = False
-
-        audio_duration = _get_audio_duration(result, to_model)
-
-        if timestamp_granularities:
-            include_words = "word" in timestamp_granularities
-            include_segments = "segment" in timestamp_granularities
-        elif response_format == "verbose_json":
-            # Default timestamp granularity is segment for verbose_json
-            include_segments = True
-
-        if response_format == "text":
-            content = to_txt(result)
-            return PlainTextResponse(content=content, media_type="text/plain")
-
-        elif response_format == "srt":
-            content = to_srt(result, highlight_words=False)
-            return PlainTextResponse(content=content, media_type="application/x-subrip")
+        include_words, include_segments = _granularity_flags(
+            tuple(timestamp_granularities or ()), response_format
+        )
 
-        elif response_format == "vtt":
-            content = to_vtt(result, highlight_words=False)
-            return PlainTextResponse(content=content, media_type="text/vtt")
+        if response_format in _TEXT_FORMATS:
+            # Formatting walks every sentence in Python; keep it off the loop
+            formatter, media_type = _TEXT_FORMATS[response_format]
+            content = await asyncio.to_thread(formatter, result)
+            return PlainTextResponse(content=content, media_type=media_type)
 
         else:  # json or verbose_json
             response_data = {
@@ -373,21 +302,22 @@ async def transcribe_audio(
             response_data["usage"] = TranscriptionUsage(seconds=round(audio_duration))
 
             # Add words OR segments (mutually exclusive) based on timestamp_granularities
+            words = None
             if include_words:
-                # Only include words, not segments
-                words = []
-                for sentence in result.sentences:
-                    if hasattr(sentence, "tokens") and sentence.tokens:
-                        for token in sentence.tokens:
-                            words.append(
-                                TranscriptionWord(
-                                    word=token.text.strip(),
-                                    start=round(token.start, 3),
-                                    end=round(token.end, 3),
-                                )
-                            )
-                if words:
-                    response_data["words"] = words
+                # Only include words, not segments. Built as plain dicts in the
+                # TranscriptionWord shape: long transcripts have tens of thousands
+                # of them, and they need no validation
+                words = [
+                    {
+                        "word": token.text.strip(),
+                        "start": round(token.start, 3),
+                        "end": round(token.end, 3),
+                    }
+                    for token in chain.from_iterable(
+                        getattr(sentence, "tokens", None) or ()
+                        for sentence in result.sentences
+                    )
+                ]
             elif include_segments:
                 # Only include segments, not words
                 segments = []
@@ -409,8 +339,7 @@ async def transcribe_audio(
                         tokens=token_ids,
                         temperature=temperature,
                         avg_logprob=-0.5,  # Default reasonable value
-                        compression_ratio=len(sentence_dict["text"])
-                        / len(zlib.compress(sentence_dict["text"].encode("utf-8"))),
+                        compression_ratio=_compression_ratio(sentence_dict["text"]),
                         no_speech_prob=0.0,
                     )
                     segments.append(segment)
@@ -422,7 +351,14 @@ async def transcribe_audio(
                     len(merged_text), duration
                 )
             )
-            return TranscriptionResponse(**response_data)
+            # Validated once here and serialised by orjson directly, instead of
+            # FastAPI re-validating it against response_model
+            payload = TranscriptionResponse(**response_data).model_dump(
+                exclude_none=True
+            )
+            if words:
+                payload["words"] = words
+            return ORJSONResponse(payload)
 
     except MemoryError as e:
         logger.error("Insufficient memory for ASR processing")
@@ -443,34 +379,267 @@ async def transcribe_audio(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Speech recognition processing failed",
         ) from exc
+    finally:
+        remove_files(*scratch_files)
+
+
+async def _preprocess_upload(src: Path) -> Tuple[Path, Path]:
+    """
+    Run ensure_mono_16k on src. A cancelled request can't stop the conversion
+    thread, so its files are removed once the conversion actually finishes.
+    """
+    conversion = asyncio.ensure_future(ensure_mono_16k_async(src))
+    try:
+        return await asyncio.shield(conversion)
+    except asyncio.CancelledError:
+        logger.info("Request cancelled during preprocessing, cleaning up")
+        conversion.add_done_callback(functools.partial(_discard_conversion, src))
+        raise
+
+
+def _discard_conversion(src: Path, done: asyncio.Future) -> None:
+    if done.cancelled() or done.exception() is not None:
+        remove_files(src)
+    else:
+        remove_files(src, *done.result())
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a raw file descriptor, looping over short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+async def _iter_upload(file: UploadFile, hasher=None) -> AsyncIterator[bytes]:
+    """
+    Yield the uploaded body in chunks, mapping read failures to HTTP 400.
+    Each chunk is also fed to hasher, if given.
+    """
+    while True:
+        try:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        except asyncio.CancelledError:
+            logger.warning("File upload cancelled during processing")
+            raise
+        except Exception as e:
+            logger.error(f"Error reading file chunk: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to read audio file: {e}",
+            ) from e
+        if not chunk:
+            return
+        if hasher is not None:
+            hasher.update(chunk)
+        yield chunk
+
+
+def _spooled_fileno(file: UploadFile) -> Optional[int]:
+    """Return the fd behind a disk-backed upload, or None while it's in memory."""
+    # Starlette spools parts past spool_max_size to disk; fileno() on a part
+    # still in memory would force a needless rollover, so check the size first
+    if file.size is None or file.size <= _SPOOL_MAX_SIZE:
+        return None
+    try:
+        return file.file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _copy_mapped(src_fd: int, dst_fd: int, hasher=None) -> None:
+    """
+    Hash and write src_fd's contents from its mapped pages, so the data is
+    copied once (page cache to dst) instead of being read into bytes first.
+    """
+    size = os.fstat(src_fd).st_size
+    if not size:
+        return
+    with mmap.mmap(src_fd, size, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            for offset in range(0, size, UPLOAD_CHUNK_SIZE):
+                with view[offset : offset + UPLOAD_CHUNK_SIZE] as chunk:
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    _write_all(dst_fd, chunk)
+
+
+async def _write_upload_to_fd(file: UploadFile, fd: int, hasher=None) -> None:
+    """
+    Stream the upload into fd and close it. Chunks are already large, so raw
+    os.write skips Python's write buffer; writes run in a worker thread so
+    concurrent requests keep progressing. A write already handed to the
+    thread finishes before fd is closed, even if the request is cancelled.
+    """
+    write = None
+
+    def _close_after(done: asyncio.Future) -> None:
+        if not done.cancelled():
+            done.exception()  # Retrieved so a failed write isn't logged twice
+        os.close(fd)
+
+    try:
+        spool_fd = _spooled_fileno(file)
+        if spool_fd is not None:
+            # Large uploads are already on disk; copy them in one thread hop
+            write = asyncio.ensure_future(
+                asyncio.to_thread(_copy_mapped, spool_fd, fd, hasher)
+            )
+            await asyncio.shield(write)
+            return
+
+        async for chunk in _iter_upload(file, hasher):
+            write = asyncio.ensure_future(asyncio.to_thread(_write_all, fd, chunk))
+            await asyncio.shield(write)
+    finally:
+        if write is not None and not write.done():
+            write.add_done_callback(_close_after)
+        else:
+            os.close(fd)
+
+
+async def _transcode_upload_with_ffmpeg(
+    file: UploadFile, dst: Path, hasher=None
+) -> None:
+    """
+    Pipe the upload into FFmpeg's stdin and write a 16kHz mono PCM WAV to dst,
+    overlapping the network receive with decoding.
+    """
+    ffmpeg_cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-y",
+        "-i",
+        "pipe:0",
+        "-acodec",
+        "pcm_s16le",
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        "-f",
+        "wav",
+        str(dst),
+    ]
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *ffmpeg_cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,  # We don't need stdout
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError as e:
+        logger.error("FFmpeg not found on system")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="FFmpeg is required for MP3 processing but not found on system",
+        ) from e
+
+    async def _read_stderr() -> str:
+        # Keep only the tail; it holds the actual error on pathological inputs
+        lines: Deque[str] = deque(maxlen=FFMPEG_STDERR_MAX_LINES)
+        if process.stderr:  # Check if stderr is not None
+            async for line in process.stderr:
+                line_str = line.decode(errors="ignore").strip()
+                lines.append(line_str)
+                logger.debug(f"FFmpeg: {line_str}")
+        return "\n".join(lines)
+
+    # Drain stderr while feeding stdin so FFmpeg never blocks on a full pipe
+    stderr_task = asyncio.create_task(_read_stderr())
+    try:
+        assert process.stdin is not None
+        try:
+            async for chunk in _iter_upload(file, hasher):
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # FFmpeg exited early (e.g. invalid data); its exit code says why
+            logger.debug("FFmpeg closed stdin before the upload was fully written")
+        finally:
+            process.stdin.close()
+
+        # Wait for the exit and the end of stderr together
+        return_code, stderr_str = await asyncio.gather(process.wait(), stderr_task)
+    except BaseException:
+        stderr_task.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if return_code != 0:
+        logger.error(f"FFmpeg failed with return code {return_code}")
+        logger.error(f"FFmpeg error output: {stderr_str}")
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Invalid audio format: {stderr_str[:200]}",
+        )
+    logger.debug("FFmpeg completed successfully")
+
 
+def _granularity_flags(
+    granularities: Tuple[str, ...], response_format: str
+) -> Tuple[bool, bool]:
+    """Return (include_words, include_segments) for a request."""
+    if granularities:
+        return "word" in granularities, "segment" in granularities
+    # Default timestamp granularity is segment for verbose_json
+    return False, response_format == "verbose_json"
 
-def _calculate_audio_duration(audio_path: Path) -> float:
-    """Calculate audio duration from file."""
+
+def _compression_ratio(text: str) -> float:
+    """
+    Whisper-style repetitiveness hint. Uses zlib's default level, which the
+    usual 2.4 threshold assumes.
+    """
+    return len(text) / len(zlib.compress(text.encode("utf-8")))
+
+
+def _overlap_duration(audio_duration: float) -> float:
+    """
+    Chunk overlap for parakeet-mlx: 8% of the input, capped at 15s.
+    Only inputs longer than CHUNK_DURATION (120s) are chunked at all, so in
+    practice this ranges from 9.6s to the cap, which is reached at 187.5s.
+    """
+    if audio_duration <= 0:
+        # Unknown length, keep the full overlap
+        return 15.0
+    return min(15.0, audio_duration * 0.08)
+
+
+def _read_wav_layout(audio_path: Path) -> Optional[WavLayout]:
+    """wav_layout() for the prepared file, None if it can't be read."""
     try:
-        import wave
+        return wav_layout(audio_path)
+    except OSError:
+        return None
+
 
-        with wave.open(str(audio_path), "rb") as wav_file:
-            frames = wav_file.getnframes()
-            sample_rate = wav_file.getframerate()
-            return frames / sample_rate
-    except Exception:
+def _calculate_audio_duration(layout: Optional[WavLayout]) -> float:
+    """Calculate audio duration from the WAV header's fmt and data chunks."""
+    if layout is None or not layout.bytes_per_second:
         # Fallback - return 0 if we can't determine duration
         return 0.0
+    return layout.data_size / layout.bytes_per_second
 
 
-def _get_audio_duration(result, audio_path: Path) -> float:
+def _get_audio_duration(result, layout: Optional[WavLayout]) -> float:
     """Get audio duration from parakeet result or calculate from file."""
     # Try to get duration from parakeet result first
-    if hasattr(result, "duration") and result.duration is not None:
-        return result.duration
+    duration = getattr(result, "duration", None)
+    if duration is not None:
+        return duration
 
     # If parakeet result has sentences, calculate from last sentence end time
-    if hasattr(result, "sentences") and result.sentences:
-        return max(sentence.end for sentence in result.sentences)
+    sentences = getattr(result, "sentences", None)
+    if sentences:
+        return max(sentence.end for sentence in sentences)
 
-    # Fallback to calculating from audio file
-    return _calculate_audio_duration(audio_path)
+    # Fallback to calculating from the WAV header
+    return _calculate_audio_duration(layout)
 
 
 @router.get("/debug/cfg")